@@ -6,11 +6,26 @@ import datetime
 import pytz
 import traceback
 import argparse
-from collections import defaultdict
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
 import math
+import itertools
 import time
 import matplotlib.pyplot as plt
+import msgspec
+import numpy as np
 
+try:
+    # orjson is much faster than json for the large log files
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    # numba compiles the per-ign log scan, but it can also run as plain python
+    from numba import njit
+except ImportError:
+    njit = None
 
 # for running main() as an async function
 import nest_asyncio
@@ -22,6 +37,82 @@ RED = "\u001b[31m"
 RESET = "\u001b[0m"
 
 
+def _scan_logs(
+    timestamps,
+    is_joins,
+    group_starts,
+    group_ends,
+    furthest_timestamp,
+    missing_timestamp,
+    reconnect_timeout_us,
+    join_log_timeout_us,
+    long_join_us,
+    max_us_per_login,
+    last_joins,
+    last_leaves,
+    num_hours,
+    long_joins,
+    num_long_joins,
+):
+    """
+    Calculate the activity of each ign from logs grouped by ign and sorted by timestamp within each group.
+    Timestamps and durations are in microseconds, and missing_timestamp marks a join or leave that wasn't logged.
+    Results are written to the last_* and num_* arrays, indexed by group. The long joins of group g are
+    written to long_joins[group_starts[g] : group_starts[g] + num_long_joins[g]]
+    """
+    for g in range(len(group_starts)):
+        start = group_starts[g]
+        last_join = last_joins[g]
+        last_leave = last_leaves[g]
+        total_us = 0
+        count = 0
+
+        for i in range(start, group_ends[g]):
+            timestamp = timestamps[i]
+            if is_joins[i]:
+                # they didn't just reconnect, or it's been a long while since the last recorded join
+                if (
+                    timestamp - last_leave >= reconnect_timeout_us
+                    or timestamp - last_join < join_log_timeout_us
+                ):
+                    last_join = timestamp
+            else:
+                last_leave = timestamp
+
+                # no recorded join, so they joined before the logs started
+                if last_join == missing_timestamp:
+                    last_join = furthest_timestamp
+
+                join_us = timestamp - last_join
+                if join_us >= long_join_us:
+                    if count == 0 or long_joins[start + count - 1] != last_join:
+                        long_joins[start + count] = last_join
+                        count += 1
+
+                total_us += min(max_us_per_login, join_us)
+
+        last_joins[g] = last_join
+        last_leaves[g] = last_leave
+        num_hours[g] = total_us / 1_000_000 / 60 / 60
+        num_long_joins[g] = count
+
+
+if njit is not None:
+    # nogil lets groups of igns be scanned in parallel threads
+    _scan_logs = njit(cache=True, nogil=True)(_scan_logs)
+
+
+class LogRec(msgspec.Struct):
+    """
+    A single join/leave log, as saved by DiscordLogClient
+    """
+
+    timestamp: datetime.datetime
+    ign: str
+    is_join: bool
+    is_guild_join: bool
+
+
 class DiscordLogClient(discord.Client):
     """
     A discord client that logs join/leave messages from a specific channel in a specific guild.
@@ -31,6 +122,11 @@ class DiscordLogClient(discord.Client):
     JOIN_LEAVE_PREFIX = "<:egg_right:1178195628615028776> "
     JOIN_COLOR = discord.colour.Colour(4714569)
     LEAVE_COLOR = discord.colour.Colour(15747399)
+    # key: embed color value, value: whether it's a join
+    COLOR_TO_IS_JOIN = {JOIN_COLOR.value: True, LEAVE_COLOR.value: False}
+    # Set to True if the join/leave bot puts the ign in the embed's author name,
+    # so it can be read directly instead of parsed out of the description
+    IGN_FROM_EMBED_AUTHOR = False
 
     # Saves join/leave logs from discord to a file in order of timestamp
 
@@ -70,95 +166,110 @@ class DiscordLogClient(discord.Client):
         """
         Save logs to a file
         """
-        filename = f"{self.get_log_name()}.json"
+        filename = f"{self.get_log_name()}.jsonl"
         print("Will save logs to ", filename)
         self.last_log_filename = filename
-        # save messages as a json file
+        # save messages as newline-delimited json (one log per line) so they can be streamed back in
         print(f"Saving logs to {filename}")
-        with open(filename, "w") as f:
-            json.dump(logs, f)
+        if orjson is not None:
+            with open(filename, "wb") as f:
+                for log in logs:
+                    f.write(orjson.dumps(log) + b"\n")
+        else:
+            with open(filename, "w") as f:
+                for log in logs:
+                    f.write(json.dumps(log) + "\n")
 
     async def save_messages(self):
         """
         Download logs from discord and save them to a file
         """
 
+        # Look these up once instead of on every message
+        prefix = self.JOIN_LEAVE_PREFIX
+        prefix_len = len(prefix)
+        color_to_is_join = self.COLOR_TO_IS_JOIN
+        max_messages = self.max_messages
+        max_days = self.max_days
+        ign_from_embed_author = self.IGN_FROM_EMBED_AUTHOR
+
+        # Messages come in most recent first, so logs are reversed before saving
         logs = []
         i = 0
-        today = None
+        today = datetime.datetime.now(datetime.timezone.utc)
+        max_day = today - datetime.timedelta(days=max_days + 1)  # + 1 for some leeway
+        today_ordinal = today.toordinal()
 
         try:
-            async for m in self.channel.history(limit=self.max_messages):
-                # Parse out the join/leave messages
-                if len(m.embeds) > 0:
-                    embed = m.embeds[0]
-                    msg = embed.description
-                    timestamp = m.created_at
-                    if today is None:
-                        today = datetime.datetime.now(timestamp.tzinfo)
-                        max_day = today - datetime.timedelta(
-                            days=self.max_days + 1
-                        )  # + 1 for some leeway
-
-                    if msg is None:
-                        # prob quickdesh went offline
-                        continue
-                    if msg.startswith(self.JOIN_LEAVE_PREFIX):
-                        # example log:
-                        # '<:egg_right:1178195628615028776> MyIGN has gone into a deep slumber!'
-                        timestamp_str = str(timestamp)  # str of a datetime object
-                        ign = msg[len(self.JOIN_LEAVE_PREFIX) :].split(" ")[0]
-                        if embed.color == self.JOIN_COLOR:
-                            is_join = True
-                        elif embed.color == self.LEAVE_COLOR:
-                            is_join = False
-                        else:
-                            print(
-                                f"{RED}WARNING: Unknown join/leave color {embed.color} for embed for message {msg}. Skipping.{RESET}"
-                            )
-                            continue
-
-                        logs.insert(
-                            0,
-                            {
-                                "timestamp": timestamp_str,
-                                "ign": ign,
-                                "is_join": is_join,
-                                "is_guild_join": False,
-                            },
-                        )
-                    elif "joined the guild" in msg:
-                        timestamp_str = str(timestamp)  # str of a datetime object
-                        ign = msg.split(" ")[0]
-                        logs.insert(
-                            0,
-                            {
-                                "timestamp": timestamp_str,
-                                "ign": ign,
-                                "is_join": True,
-                                "is_guild_join": True,
-                            },
-                        )
-                    if timestamp < max_day:
-                        break
-
+            # With after= and newest first, discord.py pages backwards and stops at
+            # max_day, dropping older messages itself, so no date check is needed here
+            async for m in self.channel.history(
+                limit=max_messages, after=max_day, oldest_first=False
+            ):
                 i += 1
-                if i % 100 == 0:
+                timestamp = m.created_at
+                if i % 5000 == 0:
                     print(
-                        f"msg# {i}/{self.max_messages}, day# {(today - timestamp).days}/{self.max_days}"
+                        f"msg# {i}/{max_messages}, day# {today_ordinal - timestamp.toordinal()}/{max_days}"
                     )
 
                 if i % 300 == 0:
                     time.sleep(2)  # sleep to avoid rate limits
+
+                # Parse out the join/leave messages
+                if not m.embeds:
+                    continue
+                embed = m.embeds[0]
+                msg = embed.description
+                if msg is None:
+                    # prob quickdesh went offline
+                    continue
+
+                author_ign = embed.author.name if ign_from_embed_author else None
+                if msg.startswith(prefix):
+                    # example log:
+                    # '<:egg_right:1178195628615028776> MyIGN has gone into a deep slumber!'
+                    timestamp_str = str(timestamp)  # str of a datetime object
+                    ign = author_ign or msg[prefix_len:].partition(" ")[0]
+                    is_join = color_to_is_join.get(
+                        embed.color.value if embed.color is not None else None
+                    )
+                    if is_join is None:
+                        print(
+                            f"{RED}WARNING: Unknown join/leave color {embed.color} for embed for message {msg}. Skipping.{RESET}"
+                        )
+                        continue
+
+                    logs.append(
+                        {
+                            "timestamp": timestamp_str,
+                            "ign": ign,
+                            "is_join": is_join,
+                            "is_guild_join": False,
+                        }
+                    )
+                elif "joined the guild" in msg:
+                    timestamp_str = str(timestamp)  # str of a datetime object
+                    ign = author_ign or msg.partition(" ")[0]
+                    logs.append(
+                        {
+                            "timestamp": timestamp_str,
+                            "ign": ign,
+                            "is_join": True,
+                            "is_guild_join": True,
+                        }
+                    )
         except Exception as e:
             print(e)
             print(traceback.format_exc())
             print("Error saving messages. Saving intermediate logs and exiting")
 
+            logs.reverse()
             self.save_to_file(logs)
             return
 
         # TODO possibly sort the logs by timestamp if they're not already sorted
+        logs.reverse()
         self.save_to_file(logs)
         return
 
@@ -173,6 +284,7 @@ class ActivityTracker:
     LAST_JOIN_KEY = "last_join"
     LAST_LEAVE_KEY = "last_leave"
     LAST_LONG_JOIN_KEY = "last_long_join"
+    NUM_LONG_JOINS_KEY = "num_long_joins"
     NUM_HOURS_KEY = "num_hours"
 
     # Defining what a join means
@@ -185,6 +297,8 @@ class ActivityTracker:
     NUM_LONG_JOINS_FOR_ACTIVITY = (
         20  # search for 20 long joins within the activity range
     )
+    # Only the most recent long joins are kept, the rest are just counted
+    MAX_LONG_JOINS_KEPT = NUM_LONG_JOINS_FOR_ACTIVITY + 1
 
     # Print config
     IGN_WIDTH = 20  # Adjust the width as needed
@@ -211,6 +325,23 @@ class ActivityTracker:
     MAX_TIME_PER_LOGIN_MINS = 4 * 60  # 4 hours per login
     TOTAL_TIME_FOR_ACTIVITY_MINS = 25 * 60  # 25 hours
 
+    # Timestamps are scanned as microseconds since the epoch
+    EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+    ONE_MICROSECOND = datetime.timedelta(microseconds=1)
+    MIN_TIMESTAMP = datetime.datetime.min.replace(tzinfo=PRINT_TIMEZONE)
+    MIN_TIMESTAMP_US = (MIN_TIMESTAMP - EPOCH) // ONE_MICROSECOND
+    US_PER_MIN = 60 * 1_000_000
+    # Only split the scan across threads for large logs, where it's worth the overhead
+    MIN_LOGS_FOR_PARALLEL_SCAN = 100_000
+    LOG_DTYPE = np.dtype(
+        [
+            ("timestamp", np.int64),
+            ("ign", np.int64),
+            ("is_join", np.bool_),
+            ("is_guild_join", np.bool_),
+        ]
+    )
+
     # File names for additional logs
     GUILD_LIST_FILENAME = "data/guild_list.txt"
     SB_LEVEL_LIST_FILENAME = "data/sb_level_list.txt"
@@ -222,42 +353,64 @@ class ActivityTracker:
             os.makedirs("output")
 
     def _reset(self):
-        # key: ign, value: {'last_join': timestamp, 'last_leave': timestamp, 'last_long_joins': [date1, date2, ...]}
+        # key: ign, value: {'last_join': timestamp, 'last_leave': timestamp, 'last_long_join': deque([date1, date2, ...]),
+        #                   'num_long_joins': int, 'num_hours': float}
         self.activity = defaultdict(
             lambda: {
-                self.LAST_JOIN_KEY: datetime.datetime.min.replace(
-                    tzinfo=self.PRINT_TIMEZONE
-                ),
-                self.LAST_LEAVE_KEY: datetime.datetime.min.replace(
-                    tzinfo=self.PRINT_TIMEZONE
-                ),
-                self.LAST_LONG_JOIN_KEY: [],
+                self.LAST_JOIN_KEY: self.MIN_TIMESTAMP,
+                self.LAST_LEAVE_KEY: self.MIN_TIMESTAMP,
+                self.LAST_LONG_JOIN_KEY: deque(maxlen=self.MAX_LONG_JOINS_KEPT),
+                self.NUM_LONG_JOINS_KEY: 0,
                 self.NUM_HOURS_KEY: 0,
             }
         )
 
-    def get_ign(self, log):
-        return log["ign"]
-
-    def get_is_join(self, log):
-        return log["is_join"]
-
-    def get_is_guild_join(self, log):
-        return log["is_guild_join"]
-
-    def get_timestamp(self, log):
-        return datetime.datetime.fromisoformat(log["timestamp"])
-
-    def is_long_join(self, start, end):
-        return self.is_time_within_mins(start, end, self.MINS_FOR_LONG_JOIN)
+    def load_logs(self, log_file):
+        """
+        Yield logs from log_file one at a time, least recent first
+        """
+        with open(log_file, "rb") as f:
+            first_line = f.readline()
+            if first_line.lstrip().startswith(b"["):
+                # Older log files are a single json list
+                yield from msgspec.json.decode(first_line + f.read(), type=list[LogRec])
+                return
+
+            # msgspec parses the timestamps into datetimes while decoding
+            decoder = msgspec.json.Decoder(LogRec)
+            if first_line.strip():
+                yield decoder.decode(first_line)
+            for line in f:
+                if line.strip():
+                    yield decoder.decode(line)
 
-    def get_time_within_timestamps(self, start, end):
-        diff = end - start
-        return diff.seconds
+    def load_log_arrays(self, log_file):
+        """
+        Load logs into an array with one column per field, with igns replaced by integer codes.
+        Returns the array and the list of igns indexed by code, in order of first appearance
+        """
+        ign_codes = {}
+        records = (
+            (
+                (log.timestamp - self.EPOCH) // self.ONE_MICROSECOND,
+                ign_codes.setdefault(log.ign, len(ign_codes)),
+                log.is_join,
+                log.is_guild_join,
+            )
+            for log in self.load_logs(log_file)
+        )
+        logs = np.fromiter(records, dtype=self.LOG_DTYPE)
+        return logs, list(ign_codes)
 
-    def is_time_within_mins(self, start, end, mins):
-        diff = end - start
-        return diff.seconds < 60 * mins
+    def from_timestamp_us(self, timestamp):
+        """
+        Convert a timestamp in microseconds to a datetime in PRINT_TIMEZONE, so it doesn't need converting when printed
+        """
+        if timestamp == self.MIN_TIMESTAMP_US:
+            return self.MIN_TIMESTAMP
+        return (
+            self.EPOCH + datetime.timedelta(microseconds=int(timestamp))
+        ).astimezone(self.PRINT_TIMEZONE)
 
     def load_guild_list(self):
         """
@@ -278,10 +431,11 @@ class ActivityTracker:
                 if line.startswith("--"):
                     current_rank = line.strip()[3:-3]
                 elif "●" in line:
+                    # A rank can span several lines, so add to its igns instead of replacing them
                     igns = line.split("●")
-                    guild_list[current_rank] = [
+                    guild_list.setdefault(current_rank, []).extend(
                         ign.strip() for ign in igns if ign.strip() != ""
-                    ]
+                    )
                 else:
                     # Reached the end
                     break
@@ -298,10 +452,11 @@ class ActivityTracker:
         print("\n")
 
     def get_igns_by_rank(self, igns):
-        igns_by_rank = {}
-        for rank in self.guild_list_dict.keys():
-            rank_igns = [ign for ign in igns if ign in self.guild_list_dict[rank]]
-            igns_by_rank[rank] = rank_igns
+        igns_by_rank = {rank: [] for rank in self.guild_list_dict}
+        for ign in igns:
+            rank = self._ign_to_rank.get(ign)
+            if rank is not None:
+                igns_by_rank[rank].append(ign)
         return igns_by_rank
 
     def load_sb_level_list(self):
@@ -318,18 +473,26 @@ class ActivityTracker:
                     sb_levels[ign] = float(sb_level)
         return sb_levels
 
+    def are_last_long_joins_after(self, ign, num_long_joins, start):
+        """
+        Check if the last num_long_joins long joins of ign (or all of them, if there are fewer) are at or after start
+        """
+        last_long_joins = self.activity[ign][self.LAST_LONG_JOIN_KEY]
+        if len(last_long_joins) == 0:
+            return True
+        # Long joins are in time order, so only the earliest of the last few needs to be checked
+        return last_long_joins[-min(num_long_joins, len(last_long_joins))] >= start
+
     def get_raw_to_boiled_promotion_igns(self):
         """
         Get igns that should be promoted from raw to boiled
         """
 
         raw_igns = self.guild_list_dict["Raw Egg"]
-        today = datetime.datetime.now().astimezone(self.PRINT_TIMEZONE)
-
         activity_range_start = self.nearest_log_time - datetime.timedelta(
             minutes=self.MINS_FOR_RAW_PROMOTION_ACTIVITY_RANGE
         )
-        join_date_end = today - datetime.timedelta(
+        join_date_end = self.today - datetime.timedelta(
             minutes=self.MINS_FOR_RAW_JOIN_DATE_PROMOTION_RANGE
         )
 
@@ -338,15 +501,9 @@ class ActivityTracker:
             ign
             for ign in raw_igns
             if ign in self.active_igns
-            and sum(
-                [
-                    t < activity_range_start
-                    for t in self.activity[ign][self.LAST_LONG_JOIN_KEY][
-                        -self.NUM_LONG_JOINS_FOR_RAW_PROMOTION :
-                    ]
-                ]
+            and self.are_last_long_joins_after(
+                ign, self.NUM_LONG_JOINS_FOR_RAW_PROMOTION, activity_range_start
             )
-            == 0
             and (
                 ign not in self.known_guild_join_dates
                 or self.known_guild_join_dates[ign] <= join_date_end
@@ -360,12 +517,10 @@ class ActivityTracker:
         Get igns that should be promoted from boiled to scrambled
         """
         boiled_igns = self.guild_list_dict["Boiled Egg"]
-        today = datetime.datetime.now().astimezone(self.PRINT_TIMEZONE)
-
         activity_range_start = self.nearest_log_time - datetime.timedelta(
             minutes=self.MINS_FOR_BOILED_PROMOTION_ACTIVITY_RANGE
         )
-        join_date_end = today - datetime.timedelta(
+        join_date_end = self.today - datetime.timedelta(
             minutes=self.MINS_FOR_BOILED_JOIN_DATE_PROMOTION_RANGE
         )
 
@@ -374,15 +529,9 @@ class ActivityTracker:
             ign
             for ign in boiled_igns
             if ign in self.active_igns
-            and sum(
-                [
-                    t < activity_range_start
-                    for t in self.activity[ign][self.LAST_LONG_JOIN_KEY][
-                        -self.NUM_LONG_JOINS_FOR_BOILED_PROMOTION :
-                    ]
-                ]
+            and self.are_last_long_joins_after(
+                ign, self.NUM_LONG_JOINS_FOR_BOILED_PROMOTION, activity_range_start
             )
-            == 0
             and (
                 ign not in self.known_guild_join_dates
                 or self.known_guild_join_dates[ign] <= join_date_end
@@ -396,82 +545,105 @@ class ActivityTracker:
         """
         Calculate whether a person is currently active using the defined constants
         """
-        with open(log_file, "r") as f:
-            logs = json.load(f)
-
         self.guild_list_dict = self.load_guild_list()
+        self._ign_to_rank = {
+            ign: rank for rank, igns in self.guild_list_dict.items() for ign in igns
+        }
         self.print_by_guild_rank(self.guild_list_dict, "Guild list:")
 
         self.sb_level_dict = self.load_sb_level_list()
 
         guild_list = [ign for igns in self.guild_list_dict.values() for ign in igns]
 
-        self.furthest_log_time = self.get_timestamp(logs[0])
-        self.nearest_log_time = self.get_timestamp(logs[-1])
+        logs, igns = self.load_log_arrays(log_file)
+        timestamps = logs["timestamp"]
 
-        self.known_guild_join_dates = {}  # key: ign, value: timestamp
+        self.furthest_log_time = self.from_timestamp_us(timestamps[0])
+        self.nearest_log_time = self.from_timestamp_us(timestamps[-1])
 
         activity_grace_period_end = self.furthest_log_time - datetime.timedelta(
             minutes=self.MINS_FOR_ACTIVITY_RANGE
         )
+
+        # Guild joins don't depend on earlier logs, so handle them all at once
+        self.known_guild_join_dates = {}  # key: ign, value: timestamp
         igns_in_grace_period = set()
+        guild_join_idxs = np.flatnonzero(logs["is_join"] & logs["is_guild_join"])
+        for idx in guild_join_idxs:
+            ign = igns[logs["ign"][idx]]
+            timestamp = self.from_timestamp_us(timestamps[idx])
+            self.known_guild_join_dates[ign] = timestamp
+            if timestamp >= activity_grace_period_end:
+                igns_in_grace_period.add(ign)
+
+        # Group logs by ign, keeping each group sorted by timestamp
+        order = np.argsort(logs["ign"], kind="stable")
+        sorted_timestamps = timestamps[order]
+        sorted_is_join = logs["is_join"][order]
+        group_starts = np.searchsorted(logs["ign"][order], np.arange(len(igns)))
+        group_ends = np.append(group_starts[1:], len(logs))
 
         # Parse logs
-        for log in logs:
-            ign = self.get_ign(log)
-
-            # Parse this log
-            is_join = self.get_is_join(log)
-            is_guild_join = self.get_is_guild_join(log)
-            timestamp = self.get_timestamp(log)
-
-            if is_join:
-                # no recorded last join, or they just reconnected, or it's been a long while since the last recorded join
-                if (
-                    self.activity[ign][self.LAST_LEAVE_KEY] is None
-                    or not self.is_time_within_mins(
-                        self.activity[ign][self.LAST_LEAVE_KEY],
-                        timestamp,
-                        self.MINS_FOR_RECONNECT_TIMEOUT,
-                    )
-                    or self.is_time_within_mins(
-                        self.activity[ign][self.LAST_JOIN_KEY],
-                        timestamp,
-                        self.MINS_FOR_JOIN_LOG_TIMEOUT,
-                    )
-                ):
-                    self.activity[ign][self.LAST_JOIN_KEY] = timestamp
-
-                if is_guild_join:
-                    self.known_guild_join_dates[ign] = timestamp
-                    if timestamp >= activity_grace_period_end:
-                        igns_in_grace_period.add(ign)
-            else:
-                self.activity[ign][self.LAST_LEAVE_KEY] = timestamp
-
-                last_join_timestamp = self.activity[ign][self.LAST_JOIN_KEY]
-                if last_join_timestamp is None:
-                    self.activity[ign][self.LAST_JOIN_KEY] = self.furthest_log_time
-                    last_join_timestamp = self.furthest_log_time
-
-                if not self.is_time_within_mins(
-                    last_join_timestamp, timestamp, self.MINS_FOR_LONG_JOIN
-                ):
-                    if (
-                        len(self.activity[ign][self.LAST_LONG_JOIN_KEY]) == 0
-                        or self.activity[ign][self.LAST_LONG_JOIN_KEY][-1]
-                        != self.activity[ign][self.LAST_JOIN_KEY]
-                    ):
-                        self.activity[ign][self.LAST_LONG_JOIN_KEY].append(
-                            self.activity[ign][self.LAST_JOIN_KEY]
-                        )
+        last_joins = np.full(len(igns), self.MIN_TIMESTAMP_US, dtype=np.int64)
+        last_leaves = np.full(len(igns), self.MIN_TIMESTAMP_US, dtype=np.int64)
+        num_hours = np.zeros(len(igns), dtype=np.float64)
+        long_joins = np.empty(len(logs), dtype=np.int64)
+        num_long_joins = np.zeros(len(igns), dtype=np.int64)
+        if njit is None:
+            # Indexing python lists is much faster than indexing numpy arrays without numba
+            sorted_timestamps = sorted_timestamps.tolist()
+            sorted_is_join = sorted_is_join.tolist()
+
+        def scan_groups(first, last):
+            # Each group only writes to its own slice of the results, so chunks of groups can run at the same time
+            _scan_logs(
+                sorted_timestamps,
+                sorted_is_join,
+                group_starts[first:last],
+                group_ends[first:last],
+                int(timestamps[0]),
+                self.MIN_TIMESTAMP_US,
+                self.MINS_FOR_RECONNECT_TIMEOUT * self.US_PER_MIN,
+                self.MINS_FOR_JOIN_LOG_TIMEOUT * self.US_PER_MIN,
+                self.MINS_FOR_LONG_JOIN * self.US_PER_MIN,
+                self.MAX_TIME_PER_LOGIN_MINS * self.US_PER_MIN,
+                last_joins[first:last],
+                last_leaves[first:last],
+                num_hours[first:last],
+                long_joins,
+                num_long_joins[first:last],
+            )
 
-                self.activity[ign][self.NUM_HOURS_KEY] += min(
-                    self.MAX_TIME_PER_LOGIN_MINS / 60,
-                    self.get_time_within_timestamps(last_join_timestamp, timestamp)
-                    / 60
-                    / 60,
-                )
+        num_chunks = os.cpu_count() or 1
+        if (
+            njit is not None
+            and len(logs) >= self.MIN_LOGS_FOR_PARALLEL_SCAN
+            and num_chunks > 1
+        ):
+            bounds = np.linspace(0, len(igns), num_chunks + 1, dtype=np.int64).tolist()
+            with ThreadPoolExecutor(max_workers=num_chunks) as executor:
+                list(executor.map(scan_groups, bounds[:-1], bounds[1:]))
+        else:
+            scan_groups(0, len(igns))
+
+        for code, ign in enumerate(igns):
+            start = group_starts[code]
+            end = start + num_long_joins[code]
+            self.activity[ign] = {
+                self.LAST_JOIN_KEY: self.from_timestamp_us(last_joins[code]),
+                self.LAST_LEAVE_KEY: self.from_timestamp_us(last_leaves[code]),
+                self.LAST_LONG_JOIN_KEY: deque(
+                    (
+                        self.from_timestamp_us(t)
+                        for t in long_joins[
+                            max(start, end - self.MAX_LONG_JOINS_KEPT) : end
+                        ]
+                    ),
+                    maxlen=self.MAX_LONG_JOINS_KEPT,
+                ),
+                self.NUM_LONG_JOINS_KEY: int(num_long_joins[code]),
+                self.NUM_HOURS_KEY: float(num_hours[code]),
+            }
 
         # Sort igns in each category by last join time
         self.active_igns = sorted(
@@ -479,8 +651,9 @@ class ActivityTracker:
             key=lambda ign: self.activity[ign][self.LAST_JOIN_KEY],
             reverse=True,
         )
+        active_set = frozenset(self.active_igns)
         self.inactive_igns = sorted(
-            [ign for ign in self.activity.keys() if ign not in self.active_igns],
+            [ign for ign in self.activity.keys() if ign not in active_set],
             key=lambda ign: self.activity[ign][self.LAST_JOIN_KEY],
             reverse=True,
         ) + sorted([ign for ign in guild_list if ign not in self.activity.keys()])
@@ -491,26 +664,28 @@ class ActivityTracker:
         )
 
         # Remove igns that aren't currently in the guild
+        guild_set = frozenset(guild_list)
         print(
             "\n\nRemoving from active_igns:",
-            ", ".join([ign for ign in self.active_igns if ign not in guild_list]),
+            ", ".join([ign for ign in self.active_igns if ign not in guild_set]),
             "\n\n",
         )
-        self.active_igns = [ign for ign in self.active_igns if ign in guild_list]
-        self.inactive_igns = [ign for ign in self.inactive_igns if ign in guild_list]
+        self.active_igns = [ign for ign in self.active_igns if ign in guild_set]
+        self.inactive_igns = [ign for ign in self.inactive_igns if ign in guild_set]
         self.grace_period_igns = [
-            ign for ign in self.grace_period_igns if ign in guild_list
+            ign for ign in self.grace_period_igns if ign in guild_set
         ]
 
         # Remove grace period igns from the inactive list, and remove active igns from the grace period list
+        active_set = frozenset(self.active_igns)
         self.grace_period_igns = [
-            ign for ign in self.grace_period_igns if ign not in self.active_igns
-        ]
-        self.inactive_igns = [
-            ign for ign in self.inactive_igns if ign not in self.grace_period_igns
+            ign for ign in self.grace_period_igns if ign not in active_set
         ]
+        grace_set = frozenset(self.grace_period_igns)
+        self.inactive_igns = [ign for ign in self.inactive_igns if ign not in grace_set]
 
         # Get promotion lists
+        self.today = datetime.datetime.now().astimezone(self.PRINT_TIMEZONE)
         self.raw_to_boiled_promotion_igns = self.get_raw_to_boiled_promotion_igns()
         self.boiled_to_scrambled_promotion_igns = (
             self.get_boiled_to_scrambled_promotion_igns()
@@ -535,18 +710,16 @@ class ActivityTracker:
         def print_row(ign, info):
             ign_str = f"{ign:<{self.IGN_WIDTH}}"
             if info is not None:
-                last_join_str = f"{info[self.LAST_JOIN_KEY].astimezone(self.PRINT_TIMEZONE).strftime('%b %d %H:%M'):<{self.LAST_JOIN_WIDTH}}"
-                last_long_joins_str = f"{[t.astimezone(self.PRINT_TIMEZONE).strftime('%b %d %H:%M') for t in info[self.LAST_LONG_JOIN_KEY][:-min(3, self.NUM_LONG_JOINS_FOR_ACTIVITY)-1:-1]]}"
-                if (
-                    len(info[self.LAST_LONG_JOIN_KEY])
-                    > self.NUM_LONG_JOINS_FOR_ACTIVITY
-                ):
+                # timestamps are already in PRINT_TIMEZONE
+                last_join_str = f"{info[self.LAST_JOIN_KEY].strftime('%b %d %H:%M'):<{self.LAST_JOIN_WIDTH}}"
+                last_long_joins_str = f"{[t.strftime('%b %d %H:%M') for t in itertools.islice(reversed(info[self.LAST_LONG_JOIN_KEY]), min(3, self.NUM_LONG_JOINS_FOR_ACTIVITY))]}"
+                if info[self.NUM_LONG_JOINS_KEY] > self.NUM_LONG_JOINS_FOR_ACTIVITY:
                     last_long_joins_str = last_long_joins_str[:-1] + ", ...]"
                 last_longs_join_str = (
                     f"{last_long_joins_str:<{self.LAST_LONG_JOINS_WIDTH}}"
                 )
                 num_long_joins_str = (
-                    f"{len(info[self.LAST_LONG_JOIN_KEY]):<{self.NUM_LONG_JOINS_WIDTH}}"
+                    f"{info[self.NUM_LONG_JOINS_KEY]:<{self.NUM_LONG_JOINS_WIDTH}}"
                 )
                 num_hours_str = (
                     f"{math.floor(info[self.NUM_HOURS_KEY]):<{self.NUM_HOURS_WIDTH}.0f}"
@@ -675,12 +848,8 @@ class ActivityTracker:
         )
 
     def print_disclaimers(self):
-        furthest_log_time_str = self.furthest_log_time.astimezone(
-            self.PRINT_TIMEZONE
-        ).strftime("%b %d %Y %H:%M")
-        nearest_log_time_str = self.nearest_log_time.astimezone(
-            self.PRINT_TIMEZONE
-        ).strftime("%b %d %Y %H:%M")
+        furthest_log_time_str = self.furthest_log_time.strftime("%b %d %Y %H:%M")
+        nearest_log_time_str = self.nearest_log_time.strftime("%b %d %Y %H:%M")
         # Get the last modification time
         guild_list_last_modified = datetime.datetime.fromtimestamp(
             os.path.getmtime(self.GUILD_LIST_FILENAME)
@@ -719,7 +888,7 @@ class ActivityTracker:
         return [
             ign
             for ign in sum(self.guild_list_dict.values(), [])
-            if len(self.activity[ign][self.LAST_LONG_JOIN_KEY])
+            if self.activity[ign][self.NUM_LONG_JOINS_KEY]
             >= self.NUM_LONG_JOINS_FOR_ACTIVITY
             or self.activity[ign][self.NUM_HOURS_KEY]
             >= self.TOTAL_TIME_FOR_ACTIVITY_MINS / 60
@@ -778,7 +947,7 @@ if __name__ == "__main__":
         required=False,
         type=str,
         default=None,
-        help="Set this json file path to use offline data and don't download",
+        help="Set this log file path to use offline data and don't download",
     )
     args = parser.parse_args()
     asyncio.run(main(args))
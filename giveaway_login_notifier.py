@@ -32,7 +32,7 @@ class DiscordNotificationClient(discord.Client):
 
         self.guild_id = guild_id
         self.channel_id = channel_id
-        self.igns_to_look_for = [ign.lower().strip() for ign in igns_to_look_for]
+        self.igns_to_look_for = frozenset(ign.casefold().strip() for ign in igns_to_look_for)
 
     async def on_ready(self):
         """
@@ -46,7 +46,7 @@ class DiscordNotificationClient(discord.Client):
         else:
             print(f"{RED}ERROR: Guild with ID {self.guild_id} not found.{RESET}")
 
-        print("Will look for igns", self.igns_to_look_for, "(not case sensitive)")
+        print("Will look for igns", sorted(self.igns_to_look_for), "(not case sensitive)")
 
     async def on_message(self, message):
         """
@@ -58,23 +58,20 @@ class DiscordNotificationClient(discord.Client):
 
         # Check if the message is from the designated channel
         if message.channel.id == self.channel_id:
+            prefix = self.JOIN_LEAVE_PREFIX
             if len(message.embeds) > 0:
                 embed = message.embeds[0]
                 message_text = embed.description
             else:
                 message_text = None
             # Check if the message content starts with the required prefix
-            if message_text is not None and message_text.startswith(self.JOIN_LEAVE_PREFIX):
-                print("message was a join/leave message")
+            if message_text is not None and message_text.startswith(prefix):
                 # Extract the username from the message content
-                message_parts = message_text.split()
-                print("message parts:", message_parts)
+                username_in_message = message_text[len(prefix):].partition(" ")[0]
                 # Ensure there is a word after the prefix
-                if len(message_parts) > 1:
-                    username_in_message = message_parts[1]
-                    print("username in message", username_in_message)
+                if username_in_message:
                     # Check if the extracted username is in our scan list
-                    if username_in_message.lower() in self.igns_to_look_for:
+                    if username_in_message.casefold() in self.igns_to_look_for:
                         print("✅ Sending notification because username is in list")
                         notification = Notify()
                         notification.title = "GUILD GIVEAWAY"
@@ -1,10 +1,22 @@
 import discord
 import asyncio
 import json
-import nest_asyncio
+import os
+import pickle
 import argparse
+import re
+import sys
 
-nest_asyncio.apply()
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Matches each ign in a line of the guild list, e.g. "IGN1 ● IGN2 ●"
+IGN_PATTERN = re.compile(r"\s*([^●\n]+?)\s*(?:●|$)")
+
+# Bump this whenever the parsers' output changes, so old caches aren't reused
+PARSE_CACHE_VERSION = 4
 
 class DiscordRoleUpdaterClient(discord.Client):
     """
@@ -13,19 +25,37 @@ class DiscordRoleUpdaterClient(discord.Client):
 
     ROLE_NAME = "active coolio"  # The role to be added or removed
 
-    def __init__(self, guild_id, member_names, active_list, *args, **kwargs):
+    def __init__(self, guild_id, max_concurrency=10, incremental=False, *args, **kwargs):
         intents = discord.Intents.default()
         intents.members = True
         intents.guilds = True
+        # In incremental mode members are queried by name, so don't download the whole guild at startup
+        kwargs.setdefault("chunk_guilds_at_startup", not incremental)
         super().__init__(intents=intents, *args, **kwargs)
 
         self.guild_id = guild_id
+        self.max_concurrency = max_concurrency
+        self.incremental = incremental
+
+        # The lists are loaded while the client logs in, and set with set_lists()
+        self.member_names = None
+        self.active_list = None
+        self.lists_loaded = asyncio.Event()
+
+    def set_lists(self, member_names, active_list):
+        """
+        Sets the guild and active lists, letting on_ready continue.
+        """
         self.member_names = member_names
         self.active_list = active_list
+        self.lists_loaded.set()
 
     async def on_ready(self):
         print(f"Logged in as {self.user}")
 
+        # on_ready can fire before the lists finish loading
+        await self.lists_loaded.wait()
+
         print("Getting guild...")
         guild = self.get_guild(self.guild_id)
         if guild is None:
@@ -40,110 +70,271 @@ class DiscordRoleUpdaterClient(discord.Client):
             await self.close()
             return
 
-        print("Fetching members...")
-        # Try to fetch members via the API (works better for large guilds).
-        # Fall back to cached `guild.members` if fetch fails or is unavailable.
-        member_list = []
-        try:
-            async for m in guild.fetch_members(limit=None):
-                member_list.append(m)
-        except Exception as e:
-            print(f"fetch_members failed ({e}); falling back to cached members.")
-            member_list = list(guild.members)
-
-        if member_list:
-            print(f"Found {len(member_list)} members from fetch.")
+        # Requests run concurrently, with at most max_concurrency in flight to stay under rate limits
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        if self.incremental:
+            print("Querying members by name...")
+            members_by_name = await self.query_members_by_name(guild, semaphore)
         else:
-            print(f"Using cached members: {len(guild.members)}")
-            member_list = list(guild.members)
-
-        for name in self.member_names:
-            # Search by nickname, name, and global_name
-            member = discord.utils.find(
-                lambda m:
-                    (m.nick is not None and m.nick.strip().lower() == name.strip().lower())
-                    or (m.name is not None and m.name.strip().lower() == name.strip().lower())
-                    or (getattr(m, 'global_name', None) is not None and m.global_name.strip().lower() == name.strip().lower()),
-                member_list
-            )
+            members_by_name = await self.fetch_members_by_name(guild)
+
+        async def set_roles(ign, member, roles, message):
+            try:
+                async with semaphore:
+                    await member.edit(roles=roles)
+            except Exception as e:
+                return f"Failed to update roles for {ign}: {e}"
+            return message
+
+        # Lines are collected here and written once at the end, instead of printing per member.
+        # Role updates finish in any order, so each one gets a slot in the log that's filled in afterwards
+        log = []
+        slots = []
+        tasks = []
+        for ign, name in self.member_names:
+            member = members_by_name[name]
 
             if member is None:
-                print(f"🚫 {name} not found in server (by nickname or username).")
+                log.append(f"🚫 {ign} not found in server (by nickname or username).")
                 continue
 
             # For demonstration, let's treat everyone in the list as requiring the 'active coolio' role
             # Adjust logic as needed for your specific promotion/demotion rules
 
+            # Roles are changed with a single member edit, which sets the member's full role list in one request.
+            role_ids = member_role_ids(member)
             if name in self.active_list:
-                if role not in member.roles:
-                    await member.add_roles(role)
-                    print(f"✅ Added role '{self.ROLE_NAME}' to {name}.")
+                if role.id not in role_ids:
+                    new_roles = [discord.Object(id=role_id) for role_id in role_ids | {role.id}]
+                    slots.append(len(log))
+                    log.append(None)
+                    tasks.append(set_roles(ign, member, new_roles, f"✅ Added role '{self.ROLE_NAME}' to {ign}."))
                 else:
-                    print(f"{name} already has role '{self.ROLE_NAME}'.")
+                    log.append(f"{ign} already has role '{self.ROLE_NAME}'.")
             else:
-                if role in member.roles:
-                    await member.remove_roles(role)
-                    print(f"❌ Removed role '{self.ROLE_NAME}' from {name}.")
+                if role.id in role_ids:
+                    new_roles = [discord.Object(id=role_id) for role_id in role_ids - {role.id}]
+                    slots.append(len(log))
+                    log.append(None)
+                    tasks.append(set_roles(ign, member, new_roles, f"❌ Removed role '{self.ROLE_NAME}' from {ign}."))
                 else:
-                    print(f"{name} does not have role '{self.ROLE_NAME}' to remove.")
+                    log.append(f"{ign} does not have role '{self.ROLE_NAME}' to remove.")
+
+        # set_roles catches its own failures, so one failed edit doesn't stop the others
+        for slot, message in zip(slots, await asyncio.gather(*tasks)):
+            log[slot] = message
+        if log:
+            sys.stdout.write("\n".join(log) + "\n")
 
         await self.close()
 
+    async def fetch_members_by_name(self, guild):
+        """
+        Gets every member of the guild, then finds each name in self.member_names.
+        Returns a dict of normalized name to member (None if not found).
+        """
+        print("Fetching members...")
+        # With the members intent, guilds are chunked at startup so `guild.members` is usually complete already.
+        # Only fetch members via the API if the cache is missing some.
+        member_list = list(guild.members)
+        if guild.member_count is not None and len(member_list) >= guild.member_count:
+            print(f"Using cached members: {len(member_list)}")
+        else:
+            # Fall back to cached `guild.members` if fetch fails or is unavailable.
+            try:
+                member_list = [m async for m in guild.fetch_members(limit=None)]
+            except Exception as e:
+                print(f"fetch_members failed ({e}); falling back to cached members.")
+                member_list = list(guild.members)
+
+            if member_list:
+                print(f"Found {len(member_list)} members from fetch.")
+            else:
+                print(f"Using cached members: {len(guild.members)}")
+                member_list = list(guild.members)
+
+        # Index members by nickname, name, and global_name so each search is a dict lookup
+        by_nick = {}
+        by_name = {}
+        by_global_name = {}
+        for m in member_list:
+            nick, name, global_name = normalized_member_names(m)
+            if nick is not None:
+                by_nick.setdefault(nick, m)
+            if name is not None:
+                by_name.setdefault(name, m)
+            if global_name is not None:
+                by_global_name.setdefault(global_name, m)
+
+        # Search by nickname, name, and global_name. Names are already normalized by load_guild_list
+        return {
+            name: by_nick.get(name) or by_name.get(name) or by_global_name.get(name)
+            for _, name in self.member_names
+        }
+
+    async def query_members_by_name(self, guild, semaphore):
+        """
+        Queries the gateway for each name in self.member_names, instead of getting every member of the guild.
+        Returns a dict of normalized name to member (None if not found).
+        """
+
+        async def query(name):
+            async with semaphore:
+                matches = await guild.query_members(query=name, limit=5)
+            return next((m for m in matches if name in normalized_member_names(m)), None)
+
+        results = await asyncio.gather(*(query(name) for _, name in self.member_names), return_exceptions=True)
+        members_by_name = {}
+        for (ign, name), result in zip(self.member_names, results):
+            if isinstance(result, Exception):
+                print(f"Failed to query {ign}: {result}")
+                result = None
+            members_by_name[name] = result
+        return members_by_name
+
+def normalize_name(name):
+    """
+    Returns the name stripped and lowercased, so igns and member names compare case-insensitively.
+    """
+    return name.strip().lower()
+
+def normalized_member_names(member):
+    """
+    Returns the member's nickname, name, and global_name, normalized with normalize_name (None if not set).
+    """
+    return tuple(
+        normalize_name(n) if n is not None else None
+        for n in (member.nick, member.name, getattr(member, 'global_name', None))
+    )
+
+def member_role_ids(member):
+    """
+    Returns the set of the member's role ids, not including @everyone.
+    Uses the member's stored role ids when available, since member.roles builds a sorted list of Role objects.
+    """
+    role_ids = getattr(member, '_roles', None)
+    if role_ids is None:
+        return {r.id for r in member.roles if not r.is_default()}
+    return set(role_ids)
+
+def cached_parse(filename, parser):
+    """
+    Returns parser(filename), reusing the result cached next to the file if the file hasn't changed since.
+    """
+    stat = os.stat(filename)
+    key = (PARSE_CACHE_VERSION, stat.st_mtime_ns, stat.st_size)
+    cache_filename = f"{filename}.cache.pkl"
+    try:
+        with open(cache_filename, "rb") as f:
+            cached_key, result = pickle.load(f)
+        if cached_key == key:
+            return result
+    except (OSError, pickle.PickleError, EOFError, ValueError, TypeError):
+        # No cache yet, or it's unreadable
+        pass
+
+    result = parser(filename)
+    try:
+        with open(cache_filename, "wb") as f:
+            pickle.dump((key, result), f)
+    except OSError as e:
+        # The cache is only an optimisation, so carry on without it
+        print(f"Couldn't write cache {cache_filename} ({e}).")
+    return result
+
 def load_guild_list(filename="data/guild_list.txt"):
     """
     Parses data/guild_list.txt in the same style as ActivityTracker.load_guild_list()
-    Returns a flattened list of all IGNs across all ranks.
-    """
-    guild_list = {}
-    with open(filename, "r") as f:
-        # Skip the header
-        line = next(f)
-        while not line.startswith("--"):
-            line = next(f)
-        current_rank = line.strip()[3:-3]
-
-        # Parse the file
-        for line in f:
-            if line.startswith("--"):
-                current_rank = line.strip()[3:-3]
-            elif "●" in line:
-                igns = line.split("●")
-                guild_list[current_rank] = [ign.strip() for ign in igns if ign.strip() != ""]
-            else:
-                # Reached the end
-                break
+    Returns a flattened list of (ign, normalized ign) pairs across all ranks.
+    The ign is kept as written for output, and the normalized one is used to match members case-insensitively.
+    """
+    return cached_parse(filename, parse_guild_list)
+
+def parse_guild_list(filename):
+    with open(filename, "rb") as f:
+        lines = f.read().decode("utf-8").splitlines()
+
+    # Parse the file in one pass, skipping the header until the first rank line.
+    # Ranks aren't needed, so igns go straight into a single list
+    all_members = []
+    in_body = False
+    for line in lines:
+        if line.startswith("--"):
+            in_body = True
+            continue
+        elif not in_body:
+            continue
+        elif "●" in line:
+            all_members.extend((ign, normalize_name(ign)) for ign in IGN_PATTERN.findall(line) if ign.strip())
+        else:
+            # Reached the end
+            break
 
-    # Flatten to single list of member names
-    all_members = [ign.strip() for igns in guild_list.values() for ign in igns]
     return all_members
 
 def load_active_list(filename="output/active_igns.txt"):
     """
     Loads the active list of members from a file.
-    Returns a list of member names.
+    Returns a set of stripped, lowercased member names.
     """
+    # Not cached, since the tracker rewrites this file every run
     try:
-        with open(filename, "r") as f:
-            active_list = [line.strip() for line in f if line.strip()]
-        return active_list
+        return parse_active_list(filename)
     except FileNotFoundError:
         print(f"File {filename} not found. Returning empty active list.")
-        return []
+        return frozenset()
+
+def parse_active_list(filename):
+    with open(filename, "rb") as f:
+        lines = f.read().decode("utf-8").splitlines()
+    return frozenset(s for s in (normalize_name(line) for line in lines) if s)
+
+def positive_int(value):
+    """
+    argparse type for options that must be at least 1.
+    """
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
 
 async def main(args):
     # Load config
-    with open("data/config.json", "r") as f:
-        config = json.load(f)
+    with open("data/config.json", "rb") as f:
+        data = f.read()
+        config = orjson.loads(data) if orjson is not None else json.loads(data)
         BOT_TOKEN = config["BOT_TOKEN"]
         GUILD_ID = config["GUILD_ID"]
 
-    member_names = load_guild_list()
-    active_list = load_active_list()
+    client = DiscordRoleUpdaterClient(GUILD_ID, max_concurrency=args.concurrency, incremental=args.incremental)
 
-    client = DiscordRoleUpdaterClient(GUILD_ID, member_names, active_list)
-    await client.start(BOT_TOKEN)
+    # Load the lists in threads while the client logs in, instead of before
+    login = asyncio.create_task(client.start(BOT_TOKEN))
+    try:
+        member_names, active_list = await asyncio.gather(
+            asyncio.to_thread(load_guild_list), asyncio.to_thread(load_active_list)
+        )
+    except Exception:
+        await client.close()
+        raise
+    client.set_lists(member_names, active_list)
+    await login
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--concurrency",
+        "-c",
+        type=positive_int,
+        default=10,
+        help="Max number of role updates to send to discord at once",
+    )
+    parser.add_argument(
+        "--incremental",
+        "-i",
+        action="store_true",
+        help="Look up each member by name instead of fetching every member of the guild",
+    )
     args = parser.parse_args()
     asyncio.run(main(args))